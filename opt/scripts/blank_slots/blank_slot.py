@@ -1,19 +1,31 @@
 #!/usr/bin/env python3
 # Ubuntu 22 / X11
-# - Detect monitors via xrandr (name, x, y, width, height)
+# - Detect monitors via RandR (name, x, y, width, height)
 # - For each monitor: detect blank slots (>=97% black OR white)
+# - Capture via MIT-SHM (falls back to XGetImage)
 # - Check every second
 # - Log duration of blank slot
 # - Plus: syslog events on state changes
 
-import subprocess
+import atexit
+import ctypes
+import ctypes.util
+import os
+import sys
 import time
 import logging
-from dataclasses import dataclass
+from datetime import datetime as _dt
 from typing import Dict, List, Tuple
 
 import numpy as np
 from Xlib import display, X
+from Xlib.ext import randr
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:  # optional: falls back to the NumPy path
+    HAVE_NUMBA = False
 
 # ---------- Tuning ----------
 BASE_SAMPLE_SEC = 1.0                 # check every second
@@ -22,6 +34,13 @@ BLACK_THRESH = 15                     # gray < 15 -> black
 WHITE_THRESH = 240                    # gray > 240 -> white
 DEBOUNCE_CLEAR_OK_FRAMES = 2          # to end a 'continuous blank' state
 DOWNSCALE = 0.5                       # analyze at 50% size
+LUMA_WEIGHTS = (29, 150, 77)          # B, G, R weights /256 (BT.601)
+SAMPLE_FRACTION = 0.05                # rows sampled while not blank
+SAMPLE_SUSPECT_PCT = 80.0             # sampled black/white% forcing full scan
+# per-frame [DEBUG] console output: interactive runs or BLANKWATCH_DEBUG=1
+DEBUG = os.environ.get("BLANKWATCH_DEBUG") == "1" or sys.stdout.isatty()
+# fused Numba kernels cover the 2x2 downscale; anything else uses NumPy
+USE_NUMBA = HAVE_NUMBA and abs(DOWNSCALE - 0.5) < 1e-6
 
 # ---------- Syslog (added) ----------
 import syslog
@@ -57,69 +76,410 @@ def ts() -> str:
 
 def iso(dt: float) -> str:
     # ISO8601 timestamp for logs
-    import datetime as _dt
-    return _dt.datetime.fromtimestamp(dt).isoformat()
+    return _dt.fromtimestamp(dt).isoformat()
 
-def get_monitors() -> List[Dict]:
-    out = subprocess.check_output(["xrandr", "--query"], text=True)
+def get_monitors(dsp) -> List[Dict]:
+    """Query active outputs over RandR on an open Display."""
+    if not dsp.has_extension("RANDR"):
+        return []
+    root = dsp.screen().root
+    res = root.xrandr_get_screen_resources_current()
     mons = []
-    for line in out.splitlines():
-        if " connected" in line and ("+" in line) and ("x" in line):
-            parts = line.split()
-            name = parts[0]
-            geom_token = None
-            for p in parts:
-                if "x" in p and "+" in p:
-                    try:
-                        wh, xy = p.split("+", 1)
-                        w, h = wh.split("x")
-                        x_str, y_str = xy.split("+")
-                        w = int(w); h = int(h); x = int(x_str); y = int(y_str)
-                        geom_token = (w, h, x, y)
-                        break
-                    except Exception:
-                        continue
-            if geom_token:
-                w, h, x, y = geom_token
-                mons.append({"name": name, "x": x, "y": y, "w": w, "h": h})
+    for output in res.outputs:
+        info = dsp.xrandr_get_output_info(output, res.config_timestamp)
+        if info.connection != randr.Connected or not info.crtc:
+            continue
+        crtc = dsp.xrandr_get_crtc_info(info.crtc, res.config_timestamp)
+        mons.append({"name": info.name, "x": crtc.x, "y": crtc.y,
+                     "w": crtc.width, "h": crtc.height})
     return mons
 
-def capture_gray(x: int, y: int, w: int, h: int) -> np.ndarray:
-    dsp = display.Display()
-    root = dsp.screen().root
+# ---------- MIT-SHM capture ----------
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+ZPIXMAP = 2
+ALL_PLANES = 0xffffffff
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+class XImage(ctypes.Structure):
+    # leading fields only; instances are always allocated by Xlib
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+    ]
+
+class XErrorEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("display", ctypes.c_void_p),
+        ("resourceid", ctypes.c_ulong),
+        ("serial", ctypes.c_ulong),
+        ("error_code", ctypes.c_ubyte),
+        ("request_code", ctypes.c_ubyte),
+        ("minor_code", ctypes.c_ubyte),
+    ]
+
+XErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p,
+                                 ctypes.POINTER(XErrorEvent))
+
+_shm = None  # dict(x11, xext, libc, dpy) once opened
+_x_errors: List[Tuple[int, int]] = []  # (error_code, request_code)
+
+@XErrorHandler
+def _on_x_error(dpy, ev):
+    # Xlib's default handler exit()s the process; record and let callers raise
+    _x_errors.append((ev.contents.error_code, ev.contents.request_code))
+    return 0
+
+def _x_check(what: str) -> None:
+    """XSync the SHM connection and raise if an X error was recorded."""
+    _shm["x11"].XSync(_shm["dpy"], 0)
+    if _x_errors:
+        code, req = _x_errors[0]
+        _x_errors.clear()
+        raise RuntimeError(f"{what}: X error {code} (request {req})")
+
+def _load_lib(name: str, soname: str, **kw) -> ctypes.CDLL:
+    return ctypes.CDLL(ctypes.util.find_library(name) or soname, **kw)
+
+def shm_open():
+    """Open a libX11 connection with MIT-SHM; None if unavailable."""
+    global _shm
+    if _shm is not None:
+        return _shm
+    try:
+        x11 = _load_lib("X11", "libX11.so.6")
+        xext = _load_lib("Xext", "libXext.so.6")
+        libc = _load_lib("c", "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+
+    vp = ctypes.c_void_p
+    x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    x11.XOpenDisplay.restype = vp
+    x11.XDefaultScreen.argtypes = [vp]
+    x11.XDefaultVisual.argtypes = [vp, ctypes.c_int]
+    x11.XDefaultVisual.restype = vp
+    x11.XDefaultDepth.argtypes = [vp, ctypes.c_int]
+    x11.XDefaultRootWindow.argtypes = [vp]
+    x11.XDefaultRootWindow.restype = ctypes.c_ulong
+    x11.XSync.argtypes = [vp, ctypes.c_int]
+    x11.XFree.argtypes = [vp]
+    x11.XCloseDisplay.argtypes = [vp]
+    x11.XSetErrorHandler.argtypes = [XErrorHandler]
+    x11.XSetErrorHandler.restype = vp
+    xext.XShmQueryExtension.argtypes = [vp]
+    xext.XShmCreateImage.argtypes = [vp, vp, ctypes.c_uint, ctypes.c_int, vp,
+                                     ctypes.POINTER(XShmSegmentInfo),
+                                     ctypes.c_uint, ctypes.c_uint]
+    xext.XShmCreateImage.restype = ctypes.POINTER(XImage)
+    xext.XShmAttach.argtypes = [vp, ctypes.POINTER(XShmSegmentInfo)]
+    xext.XShmDetach.argtypes = [vp, ctypes.POINTER(XShmSegmentInfo)]
+    xext.XShmGetImage.argtypes = [vp, ctypes.c_ulong, ctypes.POINTER(XImage),
+                                  ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+    libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+    libc.shmat.argtypes = [ctypes.c_int, vp, ctypes.c_int]
+    libc.shmat.restype = vp
+    libc.shmdt.argtypes = [vp]
+    libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, vp]
+
+    x11.XSetErrorHandler(_on_x_error)
+    dpy = x11.XOpenDisplay(None)
+    if not dpy:
+        return None
+    if not xext.XShmQueryExtension(dpy):
+        x11.XCloseDisplay(dpy)
+        return None
+    _shm = {"x11": x11, "xext": xext, "libc": libc, "dpy": dpy,
+            "root": x11.XDefaultRootWindow(dpy)}
+    return _shm
+
+def shm_attach(mon: Dict) -> bool:
+    """Allocate a shared-memory XImage sized to the monitor."""
+    shm = shm_open()
+    if shm is None:
+        return False
+    x11, xext, libc, dpy = shm["x11"], shm["xext"], shm["libc"], shm["dpy"]
+    w, h = mon["w"], mon["h"]
+    scr = x11.XDefaultScreen(dpy)
+    info = XShmSegmentInfo()
+    img = xext.XShmCreateImage(dpy, x11.XDefaultVisual(dpy, scr),
+                               x11.XDefaultDepth(dpy, scr), ZPIXMAP, None,
+                               ctypes.byref(info), w, h)
+    if not img:
+        return False
+    if img.contents.bits_per_pixel != 32:
+        x11.XFree(img)
+        return False
+    bpl = img.contents.bytes_per_line
+    size = bpl * h
+    info.shmid = libc.shmget(IPC_PRIVATE, size, IPC_CREAT | 0o600)
+    if info.shmid < 0:
+        x11.XFree(img)
+        return False
+    addr = libc.shmat(info.shmid, None, 0)
+    if addr in (None, ctypes.c_void_p(-1).value):
+        libc.shmctl(info.shmid, IPC_RMID, None)
+        x11.XFree(img)
+        return False
+    info.shmaddr = addr
+    info.readOnly = 0
+    img.contents.data = addr
+    _x_errors.clear()
+    ok = xext.XShmAttach(dpy, ctypes.byref(info))
+    x11.XSync(dpy, 0)
+    if _x_errors:  # e.g. server cannot map our segment
+        _x_errors.clear()
+        ok = False
+    # segment is freed once both we and the server detach, even on a crash
+    libc.shmctl(info.shmid, IPC_RMID, None)
+    if not ok:
+        libc.shmdt(addr)
+        x11.XFree(img)
+        return False
+
+    raw = np.ctypeslib.as_array((ctypes.c_uint8 * size).from_address(addr))
+    mon["shm_info"] = info
+    mon["shm_img"] = img
+    mon["bgra"] = raw.reshape((h, bpl // 4, 4))[:, :w]  # BGRA, persistent view
+    return True
+
+def shm_close(monitors: List[Dict]) -> None:
+    global _shm
+    if _shm is None:
+        return
+    x11, xext, libc, dpy = _shm["x11"], _shm["xext"], _shm["libc"], _shm["dpy"]
+    for m in monitors:
+        info = m.pop("shm_info", None)
+        img = m.pop("shm_img", None)
+        m.pop("bgra", None)
+        if info is None:
+            continue
+        xext.XShmDetach(dpy, ctypes.byref(info))
+        x11.XSync(dpy, 0)
+        libc.shmdt(info.shmaddr)
+        x11.XFree(img)
+    x11.XCloseDisplay(dpy)
+    _shm = None
+
+def capture_bgra(root, mon: Dict) -> np.ndarray:
+    x, y, w, h = mon["x"], mon["y"], mon["w"], mon["h"]
+    img = mon.get("shm_img")
+    if img is not None:
+        _x_errors.clear()
+        ok = _shm["xext"].XShmGetImage(_shm["dpy"], _shm["root"], img,
+                                       x, y, ALL_PLANES)
+        # BadMatch when the rectangle leaves the root (monitor resized/removed)
+        _x_check("XShmGetImage")
+        if not ok:
+            raise RuntimeError("XShmGetImage failed")
+        return mon["bgra"]
+    # fallback: no MIT-SHM (e.g. remote display)
     raw = root.get_image(x, y, w, h, X.ZPixmap, 0xffffffff)
-    buf = np.frombuffer(raw.data, dtype=np.uint8).reshape((h, w, 4))  # BGRA
-    dsp.close()
-    gray = buf[:, :, :3].mean(axis=2).astype(np.uint8)
+    return np.frombuffer(raw.data, dtype=np.uint8).reshape((h, w, 4))  # BGRA
+
+def init_capture(monitors: List[Dict]) -> None:
+    """Attach SHM and preallocate the NumPy path's per-monitor buffers."""
+    for i, m in enumerate(monitors):
+        if not shm_attach(m):
+            logging.warning(f"mon{i}: MIT-SHM unavailable, using XGetImage")
+        if USE_NUMBA:
+            continue  # kernels read the BGRA buffer directly
+        h, w = m["h"], m["w"]
+        m["lum"] = np.empty((h, w), np.uint16)
+        m["scratch"] = np.empty((h, w), np.uint16)
+        m["gray"] = np.empty((h, w), np.uint8)
+        m["acc2"] = np.empty((h // 2, w // 2), np.uint16)
+        m["gray2"] = np.empty((h // 2, w // 2), np.uint8)
+        m["sample_rows"] = sample_rows(h)
+
+def bgra_to_gray(mon: Dict, buf: np.ndarray) -> np.ndarray:
+    h, w = mon["h"], mon["w"]
+    # integer luma: dot(BGR, LUMA_WEIGHTS) >> 8; the alpha lane is never read
+    lum, tmp, gray = mon["lum"], mon["scratch"], mon["gray"]
+    np.multiply(buf[:, :, 0], LUMA_WEIGHTS[0], out=lum, dtype=np.uint16)
+    for c in (1, 2):
+        np.multiply(buf[:, :, c], LUMA_WEIGHTS[c], out=tmp, dtype=np.uint16)
+        lum += tmp
+    lum >>= 8
+    np.copyto(gray, lum, casting="unsafe")
     if DOWNSCALE != 1.0:
         if abs(DOWNSCALE - 0.5) < 1e-6:
-            h2 = h // 2
-            w2 = w // 2
-            gray = gray[:h2*2, :w2*2] \
-                     .reshape(h2, 2, w2, 2).mean(axis=(1, 3)).astype(np.uint8)
+            # 2x2 block mean from strided views, summed in uint16
+            h2 = (h // 2) * 2
+            w2 = (w // 2) * 2
+            acc, gray2 = mon["acc2"], mon["gray2"]
+            np.add(gray[0:h2:2, 0:w2:2], gray[0:h2:2, 1:w2:2],
+                   out=acc, dtype=np.uint16)
+            acc += gray[1:h2:2, 0:w2:2]
+            acc += gray[1:h2:2, 1:w2:2]
+            acc >>= 2
+            np.copyto(gray2, acc, casting="unsafe")
+            gray = gray2
         else:
             step = max(1, int(1.0 / DOWNSCALE))
             gray = gray[::step, ::step]
     return gray
 
-def blank_metrics(gray: np.ndarray) -> Tuple[float, float, bool]:
-    """Return (black_pct, white_pct, is_blank_now)."""
-    total = gray.size
+if HAVE_NUMBA:
+    @njit(inline="always")
+    def _block_luma(buf, y, x):
+        wb, wg, wr = LUMA_WEIGHTS
+        s = 0
+        # same rounding as bgra_to_gray: per-pixel >> 8, then block >> 2
+        for dy in range(2):
+            for dx in range(2):
+                s += (wb * buf[y + dy, x + dx, 0]
+                      + wg * buf[y + dy, x + dx, 1]
+                      + wr * buf[y + dy, x + dx, 2]) >> 8
+        return s >> 2
+
+    @njit(parallel=True, cache=True, fastmath=True)
+    def analyze_bgra(buf, black_thr, white_thr):
+        """Luma + 2x2 downscale + threshold counts in one pass over BGRA."""
+        h, w, _ = buf.shape
+        bc = 0
+        wc = 0
+        tot = 0
+        for yb in prange(h // 2):
+            for xb in range(w // 2):
+                g = _block_luma(buf, 2 * yb, 2 * xb)
+                if g < black_thr:
+                    bc += 1
+                elif g > white_thr:
+                    wc += 1
+                tot += 1
+        return bc, wc, tot
+
+    @njit(cache=True)
+    def prescan_bgra(buf, black_thr, white_thr, max_other):
+        """Serial analyze_bgra that stops once the frame cannot be blank.
+
+        Returns counts over the rows scanned so far; the scan ends early when
+        both non-black and non-white blocks exceed max_other.
+        """
+        h, w, _ = buf.shape
+        bc = 0
+        wc = 0
+        tot = 0
+        for yb in range(h // 2):
+            for xb in range(w // 2):
+                g = _block_luma(buf, 2 * yb, 2 * xb)
+                if g < black_thr:
+                    bc += 1
+                elif g > white_thr:
+                    wc += 1
+                tot += 1
+            if tot - bc > max_other and tot - wc > max_other:
+                break
+        return bc, wc, tot
+
+def pct_metrics(black: int, white: int, total: int) -> Tuple[float, float, bool]:
+    """Return (black_pct, white_pct, is_blank_now) from pixel counts."""
     if total == 0:
         return 0.0, 0.0, False
-    black_pct = (gray < BLACK_THRESH).sum() * 100.0 / total
-    white_pct = (gray > WHITE_THRESH).sum() * 100.0 / total
+    black_pct = black * 100.0 / total
+    white_pct = white * 100.0 / total
     blank_now = (black_pct >= BLANK_PCT_MIN) or (white_pct >= BLANK_PCT_MIN)
     return black_pct, white_pct, blank_now
 
+def sample_rows(h: int) -> np.ndarray:
+    """Fixed, sorted random subset of full-width rows."""
+    k = max(1, int(h * SAMPLE_FRACTION))
+    return np.sort(np.random.default_rng(0).choice(h, size=k, replace=False))
+
+def sample_metrics(buf: np.ndarray, rows: np.ndarray) -> Tuple[float, float, bool]:
+    """Estimate blank_metrics() from luma of the sampled BGRA rows only."""
+    # whole rows keep the gather sequential; per-pixel indexing costs ~5x more
+    px = np.take(buf, rows, axis=0)
+    # explicit uint16: NumPy 1.x would keep uint8 for small scalar weights
+    lum = np.multiply(px[:, :, 0], LUMA_WEIGHTS[0], dtype=np.uint16)
+    for c in (1, 2):
+        lum += np.multiply(px[:, :, c], LUMA_WEIGHTS[c], dtype=np.uint16)
+    lum >>= 8
+    return pct_metrics(int(np.count_nonzero(lum < BLACK_THRESH)),
+                       int(np.count_nonzero(lum > WHITE_THRESH)), lum.size)
+
+def blank_metrics(gray: np.ndarray) -> Tuple[float, float, bool]:
+    """Return (black_pct, white_pct, is_blank_now)."""
+    return pct_metrics(int(np.count_nonzero(gray < BLACK_THRESH)),
+                       int(np.count_nonzero(gray > WHITE_THRESH)), gray.size)
+
+def measure(root, mon: Dict, exact: bool = True) -> Tuple[float, float, bool]:
+    """Capture one monitor and return blank_metrics() for it.
+
+    With exact=False clearly non-blank frames are not fully scanned (early
+    exit on the Numba path, sampling otherwise); the percentages are then
+    estimates.
+    """
+    if USE_NUMBA:
+        buf = capture_bgra(root, mon)
+        if exact:
+            bc, wc, tot = analyze_bgra(buf, BLACK_THRESH, WHITE_THRESH)
+        else:
+            total = (mon["h"] // 2) * (mon["w"] // 2)
+            max_other = total * (100.0 - BLANK_PCT_MIN) / 100.0
+            bc, wc, tot = prescan_bgra(buf, BLACK_THRESH, WHITE_THRESH,
+                                       max_other)
+        return pct_metrics(bc, wc, tot)
+    buf = capture_bgra(root, mon)
+    if not exact:
+        # full luma/downscale only when the sampled estimate looks suspect
+        est = sample_metrics(buf, mon["sample_rows"])
+        if est[0] <= SAMPLE_SUSPECT_PCT and est[1] <= SAMPLE_SUSPECT_PCT:
+            return est
+    return blank_metrics(bgra_to_gray(mon, buf))
+
 # ---------- Per-monitor state ----------
-@dataclass
-class Debounce:
-    in_blank: bool = False
-    clear_left: int = 0
-    start_time: float = 0.0
-    last_black_pct: float = 0.0
-    last_white_pct: float = 0.0
+class State:
+    """Debounce state for all monitors as parallel arrays (index = monitor)."""
+
+    def __init__(self, n: int):
+        self.in_blank = np.zeros(n, bool)
+        self.clear_left = np.zeros(n, np.int32)
+        self.start_time = np.zeros(n, np.float64)
+        self.last_black_pct = np.zeros(n, np.float32)
+        self.last_white_pct = np.zeros(n, np.float32)
+
+    def update(self, ok: np.ndarray, blank_now: np.ndarray,
+               black_pct: np.ndarray, white_pct: np.ndarray, now: float):
+        """Advance one tick; monitors with ok=False keep their state.
+
+        Returns (rising, still, clearing, falling) masks.
+        """
+        blank = ok & blank_now
+        clearing = ok & ~blank_now & self.in_blank
+        rising = blank & ~self.in_blank
+        still = blank & self.in_blank
+
+        self.clear_left[rising] = DEBOUNCE_CLEAR_OK_FRAMES
+        self.start_time[rising] = now
+        self.in_blank |= rising
+        self.last_black_pct[blank] = black_pct[blank]
+        self.last_white_pct[blank] = white_pct[blank]
+
+        self.clear_left -= clearing
+        falling = clearing & (self.clear_left <= 0)
+        self.in_blank &= ~falling
+        return rising, still, clearing, falling
 
 # ---------- Main loop ----------
 def main():
@@ -128,9 +488,13 @@ def main():
     print(f"[{ts()}] Blank detector started (Ubuntu 22 / X11). Sample every {BASE_SAMPLE_SEC}s")
     logging.info("service_started sample_sec=%s" % BASE_SAMPLE_SEC)
 
-    monitors = get_monitors()
+    dsp = display.Display()
+    atexit.register(dsp.close)
+    root = dsp.screen().root
+
+    monitors = get_monitors(dsp)
     if not monitors:
-        msg = "No connected monitors found via xrandr."
+        msg = "No connected monitors found via RandR."
         print(f"[{ts()}] {msg}")
         logging.warning(msg)
         return
@@ -140,62 +504,68 @@ def main():
         print(" ", line)
         logging.info("monitor_detected " + line)
 
-    debounces: Dict[int, Debounce] = {i: Debounce() for i in range(len(monitors))}
+    init_capture(monitors)
+    atexit.register(shm_close, monitors)
+
+    n = len(monitors)
+    state = State(n)
+    ok = np.zeros(n, bool)
+    blank_now = np.zeros(n, bool)
+    black_pct = np.zeros(n)
+    white_pct = np.zeros(n)
 
+    # fixed cadence on the monotonic clock; capture time doesn't stretch it
+    t0 = time.monotonic()
+    k = 0
     while True:
         for i, m in enumerate(monitors):
-            geom = (m["x"], m["y"], m["w"], m["h"])
             try:
-                gray = capture_gray(*geom)
-                black_pct, white_pct, blank_now = blank_metrics(gray)
+                # exact counts only matter while a blank slot is open
+                black_pct[i], white_pct[i], blank_now[i] = \
+                    measure(root, m, exact=bool(state.in_blank[i]))
+                ok[i] = True
                 # Console debug each frame
-                print(f"[DEBUG] mon{i}: black%={black_pct:.2f}, white%={white_pct:.2f}, thr={BLANK_PCT_MIN}")
+                if DEBUG:
+                    print(f"[DEBUG] mon{i}: black%={black_pct[i]:.2f}, white%={white_pct[i]:.2f}, thr={BLANK_PCT_MIN}")
             except Exception as e:
+                ok[i] = False
                 err = f"mon{i}: capture error: {e}"
                 print(f"[{ts()}] {err}")
                 logging.error("error " + err)
-                continue
-
-            db = debounces[i]
-            now = time.time()
-            mon_name = m.get("name", f"mon{i}")
-
-            if blank_now:
-                if not db.in_blank:
-                    # Rising edge
-                    db.in_blank = True
-                    db.clear_left = DEBOUNCE_CLEAR_OK_FRAMES
-                    db.start_time = now
-                    db.last_black_pct = black_pct
-                    db.last_white_pct = white_pct
-
-                    print(f"[{ts()}] mon{i}: BLANK detected (start)")
-                    # Syslog: state change -> detected=1
-                    logging.critical(
-                        f'monitor="{mon_name}" blank_slot_timestamp = "{iso(now)}" blank_slot_detected=1 '
-                    )
-                else:
-                    # still blank
-                    db.last_black_pct = black_pct
-                    db.last_white_pct = white_pct
-                    print(f"[DEBUG] mon{i}: still blank (duration {now - db.start_time:.1f}s)")
-            else:
-                if db.in_blank:
-                    db.clear_left -= 1
-                    print(f"[DEBUG] mon{i}: clear_left={db.clear_left}")
-                    if db.clear_left <= 0:
-                        duration = now - db.start_time
-                        db.in_blank = False
-
-                        print(f"[{ts()}] mon{i}: BLANK ended; blank_slot_duration={duration:.1f}s")
-                        # Syslog: state cleared + duration + set detected=0
-                        logging.info(
-                            f'monitor="{mon_name}" '
-                            f'blank_slot_detected=0 blank_slot_timestamp = "{iso(now)}" blank_slot_duration={duration:.1f}s'
-                        )
-                # else: remain OK
-
-        time.sleep(BASE_SAMPLE_SEC)
+
+        now = time.monotonic()     # durations
+        wall = time.time()         # log timestamps
+        rising, still, clearing, falling = state.update(
+            ok, blank_now, black_pct, white_pct, now)
+
+        for i in np.flatnonzero(rising):
+            mon_name = monitors[i].get("name", f"mon{i}")
+            print(f"[{ts()}] mon{i}: BLANK detected (start)")
+            # Syslog: state change -> detected=1
+            logging.critical(
+                f'monitor="{mon_name}" blank_slot_timestamp = "{iso(wall)}" blank_slot_detected=1 '
+            )
+        if DEBUG:
+            for i in np.flatnonzero(still):
+                print(f"[DEBUG] mon{i}: still blank (duration {now - state.start_time[i]:.1f}s)")
+            for i in np.flatnonzero(clearing):
+                print(f"[DEBUG] mon{i}: clear_left={state.clear_left[i]}")
+        for i in np.flatnonzero(falling):
+            mon_name = monitors[i].get("name", f"mon{i}")
+            duration = now - state.start_time[i]
+            print(f"[{ts()}] mon{i}: BLANK ended; blank_slot_duration={duration:.1f}s")
+            # Syslog: state cleared + duration + set detected=0
+            logging.info(
+                f'monitor="{mon_name}" '
+                f'blank_slot_detected=0 blank_slot_timestamp = "{iso(wall)}" blank_slot_duration={duration:.1f}s'
+            )
+
+        k += 1
+        sleep_for = t0 + k * BASE_SAMPLE_SEC - time.monotonic()
+        if sleep_for > 0:
+            time.sleep(sleep_for)
+        else:
+            k += int(-sleep_for // BASE_SAMPLE_SEC)  # skip missed slots
 
 if __name__ == "__main__":
     try: